@@ -14,19 +14,20 @@
 # be the first to get 5 of their own tokens in a row, either horizontally,
 # vertically, or diagonally.
 #
-# The board is represented by a matrix with extra rows and columns forming a
-# boundary to the playing grid.  Squares in the playing grid can be occupied
-# by either 'X', 'O', or 'Empty' spaces.  The extra elements are filled with
-# 'Out of Bounds' squares, which makes some of the computations simpler.
+# The board is represented by two 36-bit integers (bitboards), one for the
+# white tokens and one for the black tokens.  Cell [i][j] of the grid is bit
+# i*6+j of each bitboard, so placing a token is a single OR and rotating a
+# subgrid is a fixed permutation of 9 bits.
 #
 
 # ---------------------------------------------------------------------------
 
 import random
-import copy
 import sys, getopt
+import os
 import time
-import numpy as np
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 
 
 # --------------------------------------------------------------------------------
@@ -57,20 +58,15 @@ def showInstructions():
     subgrids 1 and 2 are on the top, and 3 and 4 are on the bottom:
     """)
 
-    pb = PentagoBoard()
-
-    for i in range(pb.BOARD_SIZE):
-        for j in range(pb.BOARD_SIZE):
-            pb.board[i][j] = (pb.GRID_SIZE * i + j % pb.GRID_SIZE) % pb.GRID_ELEMENTS + 1
-    print(pb)
+    legend = [(GRID_SIZE * i + j % GRID_SIZE) % (GRID_SIZE * GRID_SIZE) + 1
+              for i in range(BOARD_SIZE) for j in range(BOARD_SIZE)]
+    print(formatBoard(legend))
 
     print("\nRotating subgrid " + str(1) + " Right:")
-    newBoard = pb.rotateRight(1)
-    print(newBoard)
+    print(formatBoard(rotateCells(legend, 1, RIGHT)))
 
     print("\nRotating subgrid " + str(3) + " Left:")
-    newBoard = pb.rotateLeft(3)
-    print(newBoard)
+    print(formatBoard(rotateCells(legend, 3, LEFT)))
 
 
 # ----------------------------------------------------------------------------
@@ -188,6 +184,263 @@ descr = {
 }
 
 
+# --------------------------------------------------------------------------------
+# Bitboard layout:
+#  Cell [i][j] of the grid is bit i*BOARD_SIZE+j of a bitboard.  Subgrids
+#  (gameBlocks) are numbered 1..4 in the user interface; the tables below are
+#  indexed from 0.
+# --------------------------------------------------------------------------------
+BOARD_SIZE = 6
+GRID_SIZE = 3
+NUM_CELLS = BOARD_SIZE * BOARD_SIZE
+NUM_BLOCKS = (BOARD_SIZE // GRID_SIZE) ** 2  # =4
+FULL_MASK = (1 << NUM_CELLS) - 1
+
+LEFT = 0  # counter-clockwise
+RIGHT = 1  # clockwise
+
+
+# ---------------------------------------------------------------------------
+# A move is packed into an int: (square << 3) | (rotBlock << 1) | direction,
+# with the square (0..35) to place a token in, the block (0..3) to rotate
+# and the direction (LEFT or RIGHT) to rotate it.  SQUARE_MOVES holds the 8
+# moves placing a token in each square.
+# ---------------------------------------------------------------------------
+def packMove(sq, rotBlock, direction):
+    # ---------------------------------------------------------------------------
+    # Return the move placing a token in sq and rotating rotBlock in direction.
+    # ---------------------------------------------------------------------------
+    return sq << 3 | rotBlock << 1 | direction
+
+
+def unpackMove(move):
+    # ---------------------------------------------------------------------------
+    # Return the (square, rotBlock, direction) of move.
+    # ---------------------------------------------------------------------------
+    return move >> 3, move >> 1 & 3, move & 1
+
+
+SQUARE_MOVES = tuple(tuple(packMove(sq, rotBlock, direction)
+                           for rotBlock in range(NUM_BLOCKS) for direction in (LEFT, RIGHT))
+                     for sq in range(NUM_CELLS))
+
+
+def blockSquares(block):
+    # ---------------------------------------------------------------------------
+    # Squares of the 0-based block, listed in position order (1..9).
+    # ---------------------------------------------------------------------------
+    rowOffset = (block // 2) * GRID_SIZE
+    colOffset = (block % 2) * GRID_SIZE
+    return [(rowOffset + r) * BOARD_SIZE + colOffset + c
+            for r in range(GRID_SIZE) for c in range(GRID_SIZE)]
+
+
+# ---------------------------------------------------------------------------
+# ROT_SRC[direction][k] is the position (0..8) within a block whose content
+# moves to position k when the block is rotated in that direction.
+# ---------------------------------------------------------------------------
+ROT_SRC = (
+    tuple(GRID_SIZE * c + (GRID_SIZE - 1 - r)
+          for r in range(GRID_SIZE) for c in range(GRID_SIZE)),  # LEFT
+    tuple(GRID_SIZE * (GRID_SIZE - 1 - c) + r
+          for r in range(GRID_SIZE) for c in range(GRID_SIZE)),  # RIGHT
+)
+
+
+BLOCK_MASK = [sum(1 << sq for sq in blockSquares(block)) for block in range(NUM_BLOCKS)]
+BLOCK_OFFSET = [blockSquares(block)[0] for block in range(NUM_BLOCKS)]  # first square
+
+
+def blockBits(bb, block):
+    # ---------------------------------------------------------------------------
+    # The 9 bits of the 0-based block within bitboard bb, as a pattern with
+    # position k (0..8) of the block at bit k.
+    # ---------------------------------------------------------------------------
+    offset = BLOCK_OFFSET[block]
+    return ((bb >> offset) & 0o7) | ((bb >> (offset + 3)) & 0o70) | \
+           ((bb >> (offset + 6)) & 0o700)
+
+
+# ---------------------------------------------------------------------------
+# Rotations are precomputed for each of the 4 blocks x 2 directions:
+#  ROT_PERM[block][direction] is a permutation of the 36 cells, such that
+#  the rotated board has cell ROT_PERM[block][direction][sq] at square sq.
+#  ROT_LUT[direction] maps each of the 512 patterns of a block (see
+#  blockBits) to the rotated pattern, laid out on the squares of block 0.
+#  The other blocks have the same layout BLOCK_OFFSET[block] bits higher,
+#  so rotating a block of a bitboard is one lookup and one shift.
+# ---------------------------------------------------------------------------
+def _rotationPerm(block, direction):
+    perm = list(range(NUM_CELLS))
+    squares = blockSquares(block)
+    for dst, src in enumerate(ROT_SRC[direction]):
+        perm[squares[dst]] = squares[src]
+    return tuple(perm)
+
+
+def _rotationLUT(direction):
+    squares = blockSquares(0)
+    target = [0] * (GRID_SIZE * GRID_SIZE)  # rotated square of each position
+    for dst, src in enumerate(ROT_SRC[direction]):
+        target[src] = 1 << squares[dst]
+    lut = [0] * 512
+    for pattern in range(1, 512):
+        k = pattern.bit_length() - 1
+        lut[pattern] = lut[pattern ^ (1 << k)] | target[k]
+    return tuple(lut)
+
+
+ROT_PERM = [[_rotationPerm(block, direction) for direction in (LEFT, RIGHT)]
+            for block in range(NUM_BLOCKS)]
+ROT_LUT = [_rotationLUT(direction) for direction in (LEFT, RIGHT)]
+
+
+# directions of lines: horizontal, vertical and both diagonals
+LINE_DIRECTIONS = ((0, 1), (1, 0), (1, 1), (1, -1))
+
+
+def lineStarts(length, di, dj):
+    # ---------------------------------------------------------------------------
+    # Bitboard of the cells from which a line of the given length fits on the
+    # grid in direction (di, dj).
+    # ---------------------------------------------------------------------------
+    starts = 0
+    for i in range(BOARD_SIZE):
+        for j in range(BOARD_SIZE):
+            if 0 <= i + di * (length - 1) < BOARD_SIZE and \
+                    0 <= j + dj * (length - 1) < BOARD_SIZE:
+                starts |= 1 << (i * BOARD_SIZE + j)
+    return starts
+
+
+# ---------------------------------------------------------------------------
+# The heuristic counts the lines of 3 and of 4 tokens a player has.  A run
+# of 3 tokens covers one line of 3 and scores 100; a run of 4 covers two
+# lines of 3 and one line of 4, so a line of 4 scores 800 to make the run
+# worth 1000.
+# All lines of a direction are counted at once: in a line going from cell
+# sq in steps of shift, sq + k*shift is the k-th cell, so ANDing bb with
+# bb >> shift, bb >> 2*shift, ... leaves the cells where a line of tokens
+# starts.  LINE_STARTS holds, per direction, the shift and the cells where a
+# line of 3, 4 and 5 can start without running off the grid.
+# ---------------------------------------------------------------------------
+LINE_STARTS = tuple((di * BOARD_SIZE + dj, lineStarts(3, di, dj),
+                     lineStarts(4, di, dj), lineStarts(5, di, dj))
+                    for di, dj in LINE_DIRECTIONS)
+
+
+def hasFive(bb):
+    # ---------------------------------------------------------------------------
+    # Return True if bitboard bb has 5 in a row, checking all lines of each
+    # direction at once, see LINE_STARTS.
+    # ---------------------------------------------------------------------------
+    for shift, starts3, starts4, starts5 in LINE_STARTS:
+        if bb & (bb >> shift) & (bb >> 2 * shift) & (bb >> 3 * shift) & \
+                (bb >> 4 * shift) & starts5:
+            return True
+    return False
+
+
+# ---------------------------------------------------------------------------
+# evaluateBits counts the lines of both players in one go, with the two
+# bitboards side by side in one int: the player's in bits 0..35 (lane 0) and
+# the enemy's LANE bits higher (lane 1).  Shifting by at most 4*7 bits only
+# moves lane 1 tokens into bits 36 and up of lane 0, where no line starts,
+# so PAIR_LINE_STARTS, LINE_STARTS repeated in both lanes, keeps the lanes
+# apart.
+# ---------------------------------------------------------------------------
+LANE = 64
+LANE_MASK = (1 << LANE) - 1
+PAIR_LINE_STARTS = tuple((shift, starts3 | starts3 << LANE, starts4 | starts4 << LANE,
+                          starts5 | starts5 << LANE)
+                         for shift, starts3, starts4, starts5 in LINE_STARTS)
+
+# the 16 cells away from the edges of the grid
+CENTER_MASK = sum(1 << (i * BOARD_SIZE + j)
+                  for i in range(1, BOARD_SIZE - 1) for j in range(1, BOARD_SIZE - 1))
+
+# bound on the heuristic value of a board, with every center cell and line
+# of 3 and 4 counted for one player: wins must score above it (see Player)
+MAX_HEURISTIC = 5 * CENTER_MASK.bit_count() + \
+                sum(100 * starts3.bit_count() + 800 * starts4.bit_count()
+                    for shift, starts3, starts4, starts5 in LINE_STARTS)
+
+
+# ---------------------------------------------------------------------------
+# Zobrist hashing: every (color, cell) pair gets a random 64-bit key, and a
+# board hashes to the XOR of the keys of its tokens.  ZOBRIST_ROT holds,
+# for each color, block and direction, how rotating each 9-bit block pattern
+# (see blockBits) changes the hash, so that a rotation can update the hash
+# with one lookup per color.
+# ZOBRIST_SIDE is mixed in when it is the opponent's turn.
+# ---------------------------------------------------------------------------
+_zobristRandom = random.Random(36)
+ZOBRIST = {token: [_zobristRandom.getrandbits(64) for sq in range(NUM_CELLS)]
+           for token in ("w", "b")}
+ZOBRIST_SIDE = _zobristRandom.getrandbits(64)
+
+
+def _rotationHashes(token, block, direction):
+    squares = blockSquares(block)
+    hashes = [0] * 512  # combined key of each pattern
+    for pattern in range(1, 512):
+        k = pattern.bit_length() - 1
+        hashes[pattern] = hashes[pattern ^ (1 << k)] ^ ZOBRIST[token][squares[k]]
+    changes = []
+    for pattern in range(512):
+        rotated = 0
+        for dst, src in enumerate(ROT_SRC[direction]):
+            if pattern >> src & 1:
+                rotated |= 1 << dst
+        changes.append(hashes[pattern] ^ hashes[rotated])
+    return tuple(changes)
+
+
+ZOBRIST_ROT = {token: [[_rotationHashes(token, block, direction) for direction in (LEFT, RIGHT)]
+                       for block in range(NUM_BLOCKS)]
+               for token in ("w", "b")}
+
+# transposition table entry flags: the stored value is exact, or only a
+# lower/upper bound on the true value because of an alpha-beta cutoff
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+# The transposition table is a list of TT_SIZE slots, position key k going to
+# slot k & TT_MASK, so its memory is bounded however long the searches run.
+# A slot holds (key, depth, value, flag, best move); the key tells positions
+# sharing the slot apart, and the latest position stored replaces the
+# previous one.
+TT_SIZE = 1 << 20
+TT_MASK = TT_SIZE - 1
+
+
+def rotateCells(cells, gameBlock, direction):
+    # ---------------------------------------------------------------------------
+    # Rotate gameBlock (1..4) of a list of 36 cells, for display purposes.
+    # ---------------------------------------------------------------------------
+    return [cells[src] for src in ROT_PERM[gameBlock - 1][direction]]
+
+
+def formatBoard(cells):
+    # ---------------------------------------------------------------------------
+    # Draw a list of 36 cells (row-major) as a grid split into its subgrids.
+    # ---------------------------------------------------------------------------
+    outstr = "+-------+-------+\n"
+    for offset in range(0, BOARD_SIZE, GRID_SIZE):
+        for i in range(0 + offset, GRID_SIZE + offset):
+            outstr += "| "
+            for j in range(0, GRID_SIZE):
+                outstr += str(cells[i * BOARD_SIZE + j]) + " "
+            outstr += "| "
+            for j in range(GRID_SIZE, BOARD_SIZE):
+                outstr += str(cells[i * BOARD_SIZE + j]) + " "
+            outstr += "|\n"
+        outstr += "+-------+-------+\n"
+
+    return outstr
+
+
 # --------------------------------------------------------------------------------
 
 class PentagoBoard:
@@ -198,125 +451,219 @@ class PentagoBoard:
     # apply a move
     # --------------------------------------------------------------------------------
 
+    BOARD_SIZE = BOARD_SIZE
+    GRID_SIZE = GRID_SIZE
+    GRID_ELEMENTS = GRID_SIZE * GRID_SIZE
+    __slots__ = ("w", "b", "empty", "emptyCells", "hash", "moves", "history")
+
     def __init__(self, board=""):
         # ---------------------------------------------------------------------------
         # board can be a string with 36 characters (w, b, or .) corresponding to the
         # rows of a Pentago Board, e.g., "w.b.bw.w.b.wb.w..wb....w...bw.bbb.ww"
         # Otherwise, the board is empty.
+        # self.w and self.b are the bitboards of white and black tokens,
+        # self.empty is the bitboard of empty cells.
+        # self.moves caches the legal moves, see getMoves.
+        # self.history is the undo stack of makeMove, see undoMove.
         # ---------------------------------------------------------------------------
-        self.BOARD_SIZE = 6
-        self.GRID_SIZE = 3
-        self.GRID_ELEMENTS = self.GRID_SIZE * self.GRID_SIZE
-
-        if board == "":
-            self.board = [['.' for col in range(self.BOARD_SIZE)] \
-                          for row in range(self.BOARD_SIZE)]
-            self.emptyCells = self.BOARD_SIZE ** 2
-
-        else:
-            self.board = [[board[row * self.BOARD_SIZE + col] \
-                           for col in range(self.BOARD_SIZE)] \
-                          for row in range(self.BOARD_SIZE)]
-            self.emptyCells = board.count(".")
+        self.w = 0
+        self.b = 0
+        for sq in range(len(board)):
+            if board[sq] == "w":
+                self.w |= 1 << sq
+            elif board[sq] == "b":
+                self.b |= 1 << sq
+        self.empty = FULL_MASK & ~(self.w | self.b)
+        self.emptyCells = self.empty.bit_count()
+
+        self.hash = 0
+        for sq in range(NUM_CELLS):
+            if self.w >> sq & 1:
+                self.hash ^= ZOBRIST["w"][sq]
+            elif self.b >> sq & 1:
+                self.hash ^= ZOBRIST["b"][sq]
+        self.moves = None
+        self.history = []
+
+    def cell(self, i, j):
+        # ---------------------------------------------------------------------------
+        # Token at cell [i][j]: "w", "b" or ".".
+        # ---------------------------------------------------------------------------
+        bit = 1 << (i * BOARD_SIZE + j)
+        if self.w & bit:
+            return "w"
+        if self.b & bit:
+            return "b"
+        return "."
 
     def __str__(self):
-        outstr = "+-------+-------+\n"
-        for offset in range(0, self.BOARD_SIZE, self.GRID_SIZE):
-            for i in range(0 + offset, self.GRID_SIZE + offset):
-                outstr += "| "
-                for j in range(0, self.GRID_SIZE):
-                    outstr += str(self.board[i][j]) + " "
-                outstr += "| "
-                for j in range(self.GRID_SIZE, self.BOARD_SIZE):
-                    outstr += str(self.board[i][j]) + " "
-                outstr += "|\n"
-            outstr += "+-------+-------+\n"
-
-        return outstr
+        return formatBoard(self.toString())
 
     def toString(self):
-        return "".join(item for row in self.board for item in row)
+        return "".join(self.cell(i, j) for i in range(BOARD_SIZE) for j in range(BOARD_SIZE))
 
     def getMoves(self):
         # ---------------------------------------------------------------------------
         # Determines all legal moves for player with current board,
         # and returns them in moveList.
+        # A move is an int packing the square to place a token in, the block to
+        # rotate and the direction to rotate it, see packMove.  See moveToString
+        # and parseMove for the form shown to users.
+        # The moves are kept in self.moves until the board changes, and the
+        # caller gets a list of its own, which it is free to reorder.
         # ---------------------------------------------------------------------------
+        if self.moves is not None:
+            return list(self.moves)
         moveList = []
-        for i in range(self.BOARD_SIZE):
-            for j in range(self.BOARD_SIZE):
-                if self.board[i][j] == ".":
-                    # ---------------------------------------------------------------
-                    #  For each empty cell on the grid, determine its block (1..4)
-                    #  and position (1..9)  (1..GRID_SIZE^2)
-                    # ---------------------------------------------------------------
-                    gameBlock = (i // self.GRID_SIZE) * 2 + (j // self.GRID_SIZE) + 1
-                    position = (i % self.GRID_SIZE) * self.GRID_SIZE + (j % self.GRID_SIZE) + 1
-                    pos = str(gameBlock) + "/" + str(position) + " "
-                    # ---------------------------------------------------------------
-                    #  For each block, can place a token in the given cell and
-                    #  rotate the block either left or right.
-                    # ---------------------------------------------------------------
-                    numBlocks = (self.BOARD_SIZE // self.GRID_SIZE) ** 2  # =4
-                    for k in range(numBlocks):
-                        block = str(k + 1)
-                        moveList.append(pos + block + "L")
-                        moveList.append(pos + block + "R")
-
+        empty = self.empty
+        while empty:
+            # -------------------------------------------------------------------
+            #  Take the lowest empty cell off the bitboard: can place a token
+            #  in it and rotate any block either left or right.
+            # -------------------------------------------------------------------
+            lsb = empty & -empty
+            moveList.extend(SQUARE_MOVES[lsb.bit_length() - 1])
+            empty ^= lsb
+
+        self.moves = tuple(moveList)
         return moveList
 
-    def rotateLeft(self, gameBlock):
+    def isLegal(self, move):
         # ---------------------------------------------------------------------------
-        # Rotate gameBlock counter-clockwise.  gameBlock is in [1..4].
+        # Return True if move, a well formed move (see getMoves), is legal on this
+        # board.  Any block can be rotated either way, so it is enough that the
+        # square of the move is empty: a constant time test, which does not need
+        # the list (or a set) of legal moves.
+        # ---------------------------------------------------------------------------
+        return self.empty >> (move >> 3) & 1 == 1
+
+    def clone(self):
+        # ---------------------------------------------------------------------------
+        # Return a copy of the board.  The bitboards, hash and cached moves are
+        # immutable and are shared; the undo stack (history) is copied, so the
+        # copy and the original can undo independently.  Far cheaper than
+        # copy.deepcopy.
         # ---------------------------------------------------------------------------
-        rotLeft = copy.deepcopy(self)
+        newBoard = object.__new__(PentagoBoard)
+        newBoard.w = self.w
+        newBoard.b = self.b
+        newBoard.empty = self.empty
+        newBoard.emptyCells = self.emptyCells
+        newBoard.hash = self.hash
+        newBoard.moves = self.moves
+        newBoard.history = self.history[:]
+        return newBoard
+
+    def __copy__(self):
+        return self.clone()
+
+    def __deepcopy__(self, memo):
+        # the state is immutable apart from history, which clone copies (its
+        # entries are tuples of ints), so a clone is already a deep copy
+        return self.clone()
 
-        rowOffset = ((gameBlock - 1) // 2) * self.GRID_SIZE
-        colOffset = ((gameBlock - 1) % 2) * self.GRID_SIZE
-        for i in range(0 + rowOffset, self.GRID_SIZE + rowOffset):
-            for j in range(0 + colOffset, self.GRID_SIZE + colOffset):
-                rotLeft.board[2 - j + rowOffset + colOffset][i - rowOffset + colOffset] = self.board[i][j]
+    def rotate(self, block, direction):
+        # ---------------------------------------------------------------------------
+        # Rotate block (0..3) of this board in place, LEFT or RIGHT.
+        # ---------------------------------------------------------------------------
+        keep = ~BLOCK_MASK[block]
+        lut = ROT_LUT[direction]
+        offset = BLOCK_OFFSET[block]
+        patternW = blockBits(self.w, block)
+        patternB = blockBits(self.b, block)
+        w = (self.w & keep) | (lut[patternW] << offset)
+        b = (self.b & keep) | (lut[patternB] << offset)
+        self.hash ^= ZOBRIST_ROT["w"][block][direction][patternW] ^ \
+                     ZOBRIST_ROT["b"][block][direction][patternB]
+        self.w = w
+        self.b = b
+        self.empty = FULL_MASK ^ (w | b)
+        self.moves = None
 
+    def rotateLeft(self, gameBlock):
+        # ---------------------------------------------------------------------------
+        # Rotate gameBlock counter-clockwise.  gameBlock is in [1..4].
+        # ---------------------------------------------------------------------------
+        rotLeft = self.clone()
+        rotLeft.rotate(gameBlock - 1, LEFT)
         return rotLeft
 
     def rotateRight(self, gameBlock):
         # ---------------------------------------------------------------------------
         # Rotate gameBlock clockwise.  gameBlock is in [1..4].
         # ---------------------------------------------------------------------------
-        rotRight = copy.deepcopy(self)
-
-        rowOffset = ((gameBlock - 1) // 2) * self.GRID_SIZE
-        colOffset = ((gameBlock - 1) % 2) * self.GRID_SIZE
-        for i in range(0 + rowOffset, self.GRID_SIZE + rowOffset):
-            for j in range(0 + colOffset, self.GRID_SIZE + colOffset):
-                rotRight.board[j + rowOffset - colOffset][2 - i + rowOffset + colOffset] = self.board[i][j]
-
+        rotRight = self.clone()
+        rotRight.rotate(gameBlock - 1, RIGHT)
         return rotRight
 
-    def applyMove(self, move, token):
+    def makeMove(self, move, token):
         # ---------------------------------------------------------------------------
-        # Perform the given move, and update board.
+        # Perform the given move on this board, in place.  The previous state is
+        # pushed on self.history, so that undoMove can take the move back.
         # ---------------------------------------------------------------------------
+        sq = move >> 3
+        rotBlock = move >> 1 & 3
+        direction = move & 1
+        self.history.append((self.w, self.b, self.empty, self.hash, self.moves))
+        self.emptyCells -= 1
+
+        if token == "w":
+            self.w |= 1 << sq
+        else:
+            self.b |= 1 << sq
+        self.hash ^= ZOBRIST[token][sq]
 
-        gameBlock = int(move[0])  # 1,2,3,4
-        position = int(move[2])  # 1,2,3,4,5,6,7,8,9
-        rotBlock = int(move[4])  # 1,2,3,4
-        direction = move[5]  # L,R
+        self.rotate(rotBlock, direction)
 
-        i = (position - 1) // self.GRID_SIZE + self.GRID_SIZE * ((gameBlock - 1) // 2);
-        j = ((position - 1) % self.GRID_SIZE) + self.GRID_SIZE * ((gameBlock - 1) % 2);
+    def movedBits(self, move, token):
+        # ---------------------------------------------------------------------------
+        # Return the bitboards (w, b) the board would have after the given move,
+        # leaving the board unchanged.  This is makeMove without the hash and
+        # undo bookkeeping, for positions that are only evaluated.
+        # ---------------------------------------------------------------------------
+        sq = move >> 3
+        rotBlock = move >> 1 & 3
+        direction = move & 1
+        w = self.w
+        b = self.b
+        if token == "w":
+            w |= 1 << sq
+        else:
+            b |= 1 << sq
 
-        newBoard = copy.deepcopy(self)
-        newBoard.board[i][j] = token
+        keep = ~BLOCK_MASK[rotBlock]
+        lut = ROT_LUT[direction]
+        offset = BLOCK_OFFSET[rotBlock]
+        return (w & keep) | (lut[blockBits(w, rotBlock)] << offset), \
+               (b & keep) | (lut[blockBits(b, rotBlock)] << offset)
 
-        if (direction == 'r' or direction == 'R'):
-            newBoard = newBoard.rotateRight(rotBlock);
-        else:  # direction=='l' or direction=='L'
-            newBoard = newBoard.rotateLeft(rotBlock);
+    def undoMove(self):
+        # ---------------------------------------------------------------------------
+        # Take back the last move made with makeMove.  The state before the move
+        # is restored as a whole, which is cheaper than rotating back and
+        # removing the token.
+        # ---------------------------------------------------------------------------
+        self.w, self.b, self.empty, self.hash, self.moves = self.history.pop()
+        self.emptyCells += 1
 
+    def applyMove(self, move, token):
+        # ---------------------------------------------------------------------------
+        # Perform the given move, and return the updated board.
+        # ---------------------------------------------------------------------------
+        newBoard = self.clone()
+        newBoard.makeMove(move, token)
         return newBoard
 
 
+# --------------------------------------------------------------------------------
+
+class SearchTimeout(Exception):
+    # --------------------------------------------------------------------------------
+    # Raised when a search runs past its deadline, see Player.search.
+    # --------------------------------------------------------------------------------
+    pass
+
+
 # --------------------------------------------------------------------------------
 
 class Player:
@@ -324,8 +671,25 @@ class Player:
     # Contains elements for players of human and computer types:
     # --------------------------------------------------------------------------------
 
+    # value of a win; far above MAX_HEURISTIC, so that no heuristic value gets
+    # near a win, even after the INFINITY-depth scaling of miniMax
+    INFINITY = 10 ** 6
+    # values beyond +-WIN_BOUND are wins/losses found within NUM_CELLS moves:
+    # only those are proven results, which end iterative deepening and are
+    # stored in the transposition table relative to the node
+    WIN_BOUND = INFINITY - NUM_CELLS
+    __slots__ = ("tt", "searchDepth", "timeLimit", "deadline", "workers", "parallelDepth",
+                 "pool", "sharedAlpha", "name", "playerType", "token", "enemyToken")
+
     def __init__(self, name, playerType, token):
-        self.INFINITY = 10000
+        self.tt = None  # transposition table used by miniMax, see allocateTable
+        self.searchDepth = NUM_CELLS  # most lookahead of computer moves, in plies
+        self.timeLimit = 5  # seconds a computer move may take, see search
+        self.deadline = float("inf")  # time at which _search gives up
+        self.workers = os.cpu_count() or 1  # processes to split searches over
+        self.parallelDepth = 3  # shallower searches are not worth splitting
+        self.pool = None  # created by parallelMiniMax when first needed
+        self.sharedAlpha = None  # best value found so far by the pool's processes
 
         self.name = name
 
@@ -341,449 +705,360 @@ class Player:
 
         if token.lower() in ["b", "w"]:
             self.token = token.lower()
+            self.enemyToken = "w" if self.token == "b" else "b"
 
     def __str__(self):
         return "Player " + self.name + ": type=" + self.playerType + \
                ", plays " + descr[self.token] + " tokens"
 
-    def gethumanMove(self, board):
+    def win(self, inpboard):
         # ---------------------------------------------------------------------------
-        # If the opponent is a human, the user is prompted to input a legal move.
-        # Determine the set of all legal moves, then check input move against it.
+        # Determines if player has won, by finding '5 in a row'.
         # ---------------------------------------------------------------------------
+        return hasFive(inpboard.w if self.token == "w" else inpboard.b)
 
+    def lost(self, inpboard):
         # ---------------------------------------------------------------------------
-        # In Pentago, available moves are the same for either player:
+        # Determines if player has lost, by finding 'enemy's 5 in a row'.
         # ---------------------------------------------------------------------------
-        moveList = board.getMoves()
-        move = None
-
-        ValidMove = False
-        while (not ValidMove):
-            hMove = input('Input your move (block/position block-to-rotate direction): ')
+        return hasFive(inpboard.b if self.token == "w" else inpboard.w)
 
-            for move in moveList:
-                if move == hMove:
-                    ValidMove = True
-                    break
-
-            if (not ValidMove):
-                print('Invalid move.  ')
-
-        return hMove
-
-    def win(self, inpboard):
+    def evaluate(self, inpboard):
         # ---------------------------------------------------------------------------
-        # Determines if player has won, by finding '5 in a row'.
-        row_counter = 0
-        col_counter = [0,0,0,0,0,0]
-        diagno_counter = 0
-        token = self.token
-        board = inpboard.board
-        for i in range(6):
-            for j in range(6):
-                curr = board[i][j]
-                # count elements in each row:
-                if j > 0:
-                    prev = board[i][j - 1]
-                    if curr == token :
-                        if prev == token:
-                            row_counter = row_counter + 1
-                            if row_counter == 5:
-                                return True
-                        else:
-                            row_counter = 1
-                    else:
-                        row_counter = 0
-                else:
-                    if curr == token:
-                        row_counter = 1
-                # count elements in each column:
-                if i > 0:
-                    prev = board[i - 1][j]
-                    if curr == token:
-                        if prev == token:
-                            col_counter[j] = col_counter[j] + 1
-                            if col_counter[j] == 5:
-                                return True
-                        else:
-                            col_counter[j] = 1
-                    else:
-                        col_counter[j] = 0
-                else:
-                    if curr == token:
-                        col_counter[j] = 1
-        # count elements in each column:
-        matrix = np.array(board)
-        diags = [matrix[::-1, :].diagonal(i) for i in range(-5, 6)]
-        diags.extend(matrix.diagonal(i) for i in range(5, -6, -1))
-        for n in diags:
-            for k in range(len(n)):
-                curr = n[k]
-                if k>0:
-                    prev = n[k - 1]
-                    if curr == token:
-                        if prev == token:
-                            diagno_counter = diagno_counter + 1
-                            if diagno_counter == 5:
-                                return True
-                        else:
-                            diagno_counter = 1
-                    else:
-                        diagno_counter = 0
-                else:
-                    if curr == token:
-                        diagno_counter = 1
-        return False
+        # Evaluate board for the player.  Return (value, terminal): terminal is
+        # True if the game is over, with value INFINITY if player has 5 in a row,
+        # -INFINITY if the enemy has, and 0 if both have (a tie).  Otherwise
+        # value is the heuristic: each token in the center is worth 5, each run
+        # of 3 tokens in a line 100 and each run of 4 tokens 1000, and the
+        # enemy's tokens count against player the same way.
+        # Both sides are counted in the same pass over the line directions, on
+        # the bitboards, see evaluateBits.
         # ---------------------------------------------------------------------------
+        return self.evaluateBits(inpboard.w, inpboard.b)
 
-
-
-    def lost(self, inpboard):
+    def evaluateBits(self, w, b):
+        # ---------------------------------------------------------------------------
+        # Same as evaluate, for the board with bitboards w and b.  The lines of
+        # both players are counted on the bitboards at once, see LINE_STARTS and
+        # PAIR_LINE_STARTS: for a count over both lanes, 2 * (count in lane 0)
+        # - (count over both) is the player's count minus the enemy's.
         # ---------------------------------------------------------------------------
-        # Determines if player has lost, by finding 'enemy's 5 in a row'.
-        row_counter = 0
-        col_counter = [0,0,0,0,0,0]
-        diagno_counter = 0
-        board = inpboard.board
         if self.token == "w":
-            token = "b"
+            mine, theirs = w, b
         else:
-            token = "w"
-        for i in range(6):
-            for j in range(6):
-                curr = board[i][j]
-                # count elements in each row:
-                if j > 0:
-                    prev = board[i][j - 1]
-                    if curr == token :
-                        if prev == token:
-                            row_counter = row_counter + 1
-                            if row_counter == 5:
-                                return True
-                        else:
-                            row_counter = 1
-                    else:
-                        row_counter = 0
-                else:
-                    if curr == token:
-                        row_counter = 1
-                # count elements in each column:
-                if i > 0:
-                    prev = board[i - 1][j]
-                    if curr == token:
-                        if prev == token:
-                            col_counter[j] = col_counter[j] + 1
-                            if col_counter[j] == 5:
-                                return True
-                        else:
-                            col_counter[j] = 1
-                    else:
-                        col_counter[j] = 0
-                else:
-                    if curr == token:
-                        col_counter[j] = 1
-        # count elements in each column:
-        matrix = np.array(board)
-        diags = [matrix[::-1, :].diagonal(i) for i in range(-5, 6)]
-        diags.extend(matrix.diagonal(i) for i in range(5, -6, -1))
-        for n in diags:
-            for k in range(len(n)):
-                curr = n[k]
-                if k>0:
-                    prev = n[k - 1]
-                    if curr == token:
-                        if prev == token:
-                            diagno_counter = diagno_counter + 1
-                            if diagno_counter == 5:
-                                return True
-                        else:
-                            diagno_counter = 1
-                    else:
-                        diagno_counter = 0
-                else:
-                    if curr == token:
-                        diagno_counter = 1
-        return False
-        # ---------------------------------------------------------------------------
-
-
-
+            mine, theirs = b, w
+        both = mine | theirs << LANE
+
+        won = False
+        lost = False
+        val = 5 * ((mine & CENTER_MASK).bit_count() - (theirs & CENTER_MASK).bit_count())
+        for shift, starts3, starts4, starts5 in PAIR_LINE_STARTS:
+            lines = both & (both >> shift) & (both >> 2 * shift)
+            lines3 = lines & starts3
+            lines &= both >> 3 * shift
+            lines4 = lines & starts4
+            val += 100 * (2 * (lines3 & LANE_MASK).bit_count() - lines3.bit_count()) + \
+                   800 * (2 * (lines4 & LANE_MASK).bit_count() - lines4.bit_count())
+            lines &= (both >> 4 * shift) & starts5
+            if lines:
+                if lines & LANE_MASK:
+                    won = True
+                if lines >> LANE:
+                    lost = True
+
+        if won:
+            return (0 if lost else self.INFINITY), True
+        if lost:
+            return -self.INFINITY, True
+        return val, False
 
     def h(self, inpboard):
         # ---------------------------------------------------------------------------
         # Heuristic evaluation of board, presuming it is player's move.
-        val=0
-        badval=0
-        badrow_counter = 0
-        badcol_counter = [0, 0, 0, 0, 0, 0]
-        baddiagno_counter = 0
-        row_counter = 0
-        col_counter = [0, 0, 0, 0, 0, 0]
-        diagno_counter = 0
-        board = inpboard.board
-        token = self.token
-        for i in range(6):
-            for j in range(6):
-                curr = board[i][j]
-                # check if our token in the center
-                if curr == token:
-                    if i>0:
-                        if i<5:
-                            if j>0:
-                                if j<5:
-                                    val+=5
-                # evaluate tokens in a row
-                if j > 0:
-                    prev = board[i][j - 1]
-                    if curr == token:
-                        if prev == token:
-                            row_counter = row_counter + 1
-                            if row_counter == 3:
-                                val+=100
-                            elif row_counter ==4:
-                                val+=900
-                            elif row_counter ==5:
-                                return 9999
-                        else:
-                            row_counter = 1
-                    else:
-                        row_counter = 0
-                else:
-                    if curr == token:
-                        row_counter = 1
-                # evaluate tokens in a column
-                if i > 0:
-                    prev = board[i - 1][j]
-                    if curr == token:
-                        if prev == token:
-                            col_counter[j] = col_counter[j] + 1
-                            if col_counter[j] == 3:
-                                val+=100
-                            elif col_counter[j] ==4:
-                                val+=900
-                            elif col_counter[j] ==5:
-                                return 9999
-                        else:
-                            col_counter[j] = 1
-                    else:
-                        col_counter[j] = 0
-                else:
-                    if curr == token:
-                        col_counter[j] = 1
-
-        # evaluate tokens in diagno
-
-        matrix = np.array(board)
-        diags = [matrix[::-1, :].diagonal(i) for i in range(-5, 6)]
-        diags.extend(matrix.diagonal(i) for i in range(5, -6, -1))
-        for n in diags:
-            for k in range(len(n)):
-                curr = n[k]
-                if k > 0:
-                    prev = n[k - 1]
-                    if curr == token:
-                        if prev == token:
-                            diagno_counter = diagno_counter + 1
-                            if diagno_counter == 3:
-                                val += 100
-                            elif diagno_counter == 4:
-                                val += 900
-                            elif diagno_counter == 5:
-                                return 9999
-                        else:
-                            diagno_counter = 1
-                    else:
-                        diagno_counter = 0
-                else:
-                    if curr == token:
-                        diagno_counter = 1
-
-        ######################################enemy's state###################################
-        badtoken = ""
-        if self.token == "w":
-            badtoken = "b"
-        else:
-            badtoken = "w"
-        for i in range(6):
-            for j in range(6):
-                curr = board[i][j]
-                # check if our token in the center
-                if curr == badtoken:
-                    if i > 0:
-                        if i < 5:
-                            if j > 0:
-                                if j < 5:
-                                    badval += 5
-                # evaluate tokens in a row
-                if j > 0:
-                    prev = board[i][j - 1]
-                    if curr == badtoken:
-                        if prev == badtoken:
-                            badrow_counter = badrow_counter + 1
-                            if badrow_counter == 3:
-                                badval += 100
-                            elif badrow_counter == 4:
-                                badval += 900
-                            elif badrow_counter == 5:
-                                return -9999
-                        else:
-                            badrow_counter = 1
-                    else:
-                        badrow_counter = 0
-                else:
-                    if curr == badtoken:
-                        badrow_counter = 1
-                # evaluate tokens in a column
-                if i > 0:
-                    prev = board[i - 1][j]
-                    if curr == badtoken:
-                        if prev == badtoken:
-                            badcol_counter[j] = badcol_counter[j] + 1
-                            if badcol_counter[j] == 3:
-                                badval += 100
-                            elif badcol_counter[j] == 4:
-                                badval += 900
-                            elif badcol_counter[j] == 5:
-                                return -9999
-                        else:
-                            badcol_counter[j] = 1
-                    else:
-                        badcol_counter[j] = 0
-                else:
-                    if curr == badtoken:
-                        badcol_counter[j] = 1
-
-        # evaluate tokens in diagno
-
-        matrix = np.array(board)
-        diags = [matrix[::-1, :].diagonal(i) for i in range(-5, 6)]
-        diags.extend(matrix.diagonal(i) for i in range(5, -6, -1))
-        for n in diags:
-            for k in range(len(n)):
-                curr = n[k]
-                if k > 0:
-                    prev = n[k - 1]
-                    if curr == badtoken:
-                        if prev == badtoken:
-                            baddiagno_counter = baddiagno_counter + 1
-                            if baddiagno_counter == 3:
-                                badval += 100
-                            elif baddiagno_counter == 4:
-                                badval += 900
-                            elif baddiagno_counter == 5:
-                                return -9999
-                        else:
-                            baddiagno_counter = 1
-                    else:
-                        baddiagno_counter = 0
-                else:
-                    if curr == badtoken:
-                        baddiagno_counter = 1
-
-        ######################################################################################
-        return val-badval
         # Heuristic should not do further lookahead by calling miniMax.  This
         # function estimates the value of the board at a terminal node.
         # ---------------------------------------------------------------------------
+        return self.evaluate(inpboard)[0]
 
-
-
-    def miniMax(self, board, min, depth, maxDepth):
-        # print(board,min,depth,maxDepth)
+    def miniMax(self, board, maxDepth):
         # ---------------------------------------------------------------------------
-        # Use MiniMax algorithm to determine best move for player to make for given
-        # board.  Return the chosen move and the value of applying the heuristic to
-        # the board.
+        # Use MiniMax algorithm with alpha-beta pruning to determine the player's
+        # best move on the given board.  Return the chosen move and its value.
         # To examine each of player's moves and evaluate them with no lookahead,
         # maxDepth should be set to 1.  To examine each of the opponent's moves,
         #  set maxDepth=2, etc.
-        # Increase depth by 1 on each recursive call to miniMax.
-        # min is the minimum value seen thus far by
+        # The moves below the root are searched by _search.  The root is stored
+        # in the transposition table like the other nodes, so that the next
+        # iteration of search starts from its best move.
+        # ---------------------------------------------------------------------------
+        self.allocateTable()
+        moveList = self.rootMoves(board)
+        if len(moveList) == 0:
+            return None, 0
+        finalMove, best = self.searchMoves(board, moveList, maxDepth, -self.INFINITY)
+        self.tt[board.hash & TT_MASK] = (board.hash, maxDepth, best, EXACT, finalMove)
+        return finalMove, best
+
+    def allocateTable(self):
+        # ---------------------------------------------------------------------------
+        # Create the transposition table on the first search, so that players who
+        # never search (human players) do not hold TT_SIZE slots.
+        # ---------------------------------------------------------------------------
+        if self.tt is None:
+            self.tt = [None] * TT_SIZE
+
+    def rootMoves(self, board):
+        # ---------------------------------------------------------------------------
+        # Return the player's legal moves on board, best first according to
+        # orderMoves, but with the best move found by a previous search of board
+        # (if any) first of all.
+        # ---------------------------------------------------------------------------
+        moveList = board.getMoves()
+        self.orderMoves(board, moveList, self.token, True)
+        entry = self.tt[board.hash & TT_MASK]
+        if entry is not None and entry[0] == board.hash and entry[4] is not None:
+            moveList.remove(entry[4])
+            moveList.insert(0, entry[4])
+        return moveList
+
+    def orderMoves(self, board, moveList, token, maximizing):
+        # ---------------------------------------------------------------------------
+        # Sort moveList, the moves of token on board, so that the moves after
+        # which evaluate rates the board best for the side making them come
+        # first: alpha-beta cuts off the most when the best move is searched
+        # first.  Ordering costs an evaluation per move, so it is only worth it
+        # where the moves are searched deeper than that.
+        # ---------------------------------------------------------------------------
+        moveList.sort(key=lambda move: self.evaluateBits(*board.movedBits(move, token))[0],
+                      reverse=maximizing)
+
+    def _search(self, board, depth, maxDepth, alpha, beta, maximizing):
+        # ---------------------------------------------------------------------------
+        # Alpha-beta search below the root: return the value of board with the
+        # player to move if maximizing is True, the opponent otherwise, always
+        # from the player's point of view.  depth is the number of moves made
+        # since the root (at least 1) and increases by 1 on each recursive call.
+        # alpha is the value the player is already assured of and beta the value
+        # the opponent is already assured of.  Once alpha >= beta, the remaining
+        # moves cannot change the result, so they are not examined.
         #
         # If a win is detected, the value returned should be INFINITY-depth.
         # This rates 'one move wins' higher than 'two move wins,' etc.  This ensures
         # that Player moves toward a win, rather than simply toward the assurance of
         # a win.
+        #
+        # Results are kept in the transposition table self.tt, keyed by the
+        # Zobrist hash of the board and side to move, as (key, depth searched
+        # below the node, value, EXACT/LOWER/UPPER, best move), see TT_SIZE.
+        # Win values are stored relative to the node, so they stay valid when
+        # the position is reached at another depth.  The stored best move is
+        # searched first, which is what makes iterative deepening (see search)
+        # pay off.
+        #
+        # Raises SearchTimeout once self.deadline has passed.
+        # ---------------------------------------------------------------------------
+        if time.time() > self.deadline:
+            raise SearchTimeout()
+        key = board.hash if maximizing else board.hash ^ ZOBRIST_SIDE
+        alphaOrig = alpha
+        betaOrig = beta
+        winBound = self.WIN_BOUND
+
+        ttMove = None
+        entry = self.tt[key & TT_MASK]
+        if entry is not None and entry[0] == key:
+            ttKey, ttDepth, val, flag, ttMove = entry
+            if ttDepth >= maxDepth - depth:
+                if val > winBound:
+                    val -= depth
+                elif val < -winBound:
+                    val += depth
+                if flag == EXACT:
+                    return val
+                elif flag == LOWER:
+                    alpha = max(alpha, val)
+                else:
+                    beta = min(beta, val)
+                if alpha >= beta:
+                    return val
 
-        finalMove = None
-        max = - (self.INFINITY + 1)
         moveList = board.getMoves()  # find all legal moves
-        if len(moveList)==0:
-            return None,0
+        if len(moveList) == 0:
+            return 0
+        frontier = depth + 1 >= maxDepth
+        if not frontier:
+            self.orderMoves(board, moveList, self.token if maximizing else self.enemyToken,
+                            maximizing)
+        if ttMove is not None:
+            moveList.remove(ttMove)
+            moveList.insert(0, ttMove)
+
+        if maximizing:
+            token = self.token
+            best = float("-inf")
+        else:
+            token = self.enemyToken
+            best = float("inf")
+        finalMove = None
+
+        # board is updated in place and each move is undone once searched.  The
+        # children of a frontier node (the last ply) are only evaluated, so they
+        # are scored from the bitboards of movedBits without updating board.
         for move in moveList:
-            newBoard = copy.deepcopy(board)
-            newBoard = newBoard.applyMove(move, self.token)
-            if self.win(newBoard):
-                return move, self.INFINITY
-            if depth == maxDepth:
-                return move, self.h(newBoard)
-            min = self.INFINITY + 1
-            if self.token =="b":
-                enemyToken = "w"
+            if frontier:
+                val, terminal = self.evaluateBits(*board.movedBits(move, token))
             else:
-                enemyToken = "b"
-            enemyMoveList = newBoard.getMoves()
-            if len(enemyMoveList) == 0:
-                return None,0
-            for enmove in enemyMoveList:
-                newerBoard = copy.deepcopy(newBoard)
-                newerBoard = newerBoard.applyMove(enmove, enemyToken)
-                if self.lost(newerBoard):
-                    return enmove, -(self.INFINITY)
-                if depth ==maxDepth:
-                    return enmove, self.h(newerBoard)
-                else:
-                    val = self.miniMax(newerBoard,self.INFINITY, depth+1, maxDepth)
-                    if val[1] < min:
-                        min = val[1]
-            if min > max:
-                max = min
+                board.makeMove(move, token)
+                val, terminal = self.evaluate(board)
+                if not terminal:
+                    val = self._search(board, depth + 1, maxDepth, alpha, beta, not maximizing)
+                board.undoMove()
+            if terminal:
+                if val > 0:
+                    val -= depth
+                elif val < 0:
+                    val += depth
+
+            if maximizing:
+                if val > best:
+                    best = val
+                    finalMove = move
+                    alpha = max(alpha, best)
+            elif val < best:
+                best = val
                 finalMove = move
-        return finalMove , max
-
-
-    def miniMax2(self, board, min):
+                beta = min(beta, best)
+            if alpha >= beta:
+                break
+
+        if best <= alphaOrig:
+            flag = UPPER
+        elif best >= betaOrig:
+            flag = LOWER
+        else:
+            flag = EXACT
+        # store a win/loss as its distance from this node; heuristic values never
+        # reach winBound (see MAX_HEURISTIC), so they are stored as they are
+        val = best
+        if val > winBound:
+            val += depth
+        elif val < -winBound:
+            val -= depth
+        self.tt[key & TT_MASK] = (key, maxDepth - depth, val, flag, finalMove)
+
+        return best
+
+    def search(self, board, maxDepth, timeLimit):
+        # ---------------------------------------------------------------------------
+        # Iterative deepening: search to depth 1, 2, ... maxDepth, so that each
+        # iteration starts from the best moves the previous one left in the
+        # transposition table.  An iteration still running timeLimit seconds
+        # after the start is abandoned (the first one is always completed).
+        # Return the move and value found by the deepest completed iteration.
+        # ---------------------------------------------------------------------------
+        startTime = time.time()
+        self.allocateTable()
+        historyLength = len(board.history)
+        move, value = None, 0
+        for depth in range(1, min(maxDepth, board.emptyCells) + 1):
+            self.deadline = startTime + timeLimit if depth > 1 else float("inf")
+            try:
+                if self.workers > 1 and depth >= self.parallelDepth:
+                    depthMove, depthValue = self.parallelMiniMax(board, depth)
+                else:
+                    depthMove, depthValue = self.miniMax(board, depth)
+            except SearchTimeout:
+                # take back the moves the abandoned search had made on board
+                while len(board.history) > historyLength:
+                    board.undoMove()
+                break
+            move, value = depthMove, depthValue
+            if abs(value) > self.WIN_BOUND:
+                break  # the outcome is already decided
+        self.deadline = float("inf")
+        return move, value
+
+    def searchMoves(self, board, moveList, maxDepth, alpha, sharedAlpha=None):
+        # ---------------------------------------------------------------------------
+        # Search the given player's moves on board to maxDepth, as at the root of
+        # miniMax, and return the best of them with its value.  alpha is a value
+        # the player is already assured of: moves that cannot beat it are only
+        # searched far enough to show that.
+        # sharedAlpha, if given, is a multiprocessing.Value holding the best value
+        # found by any of the processes searching the other root moves.  It is
+        # read before each move, to search with the highest alpha known, and
+        # raised when a better move is found.  Moves that do not beat the alpha
+        # they were searched with are then not returned, as their value is only
+        # a bound.
+        # ---------------------------------------------------------------------------
         finalMove = None
-        max = - (self.INFINITY + 1)
-        moveList = board.getMoves()  # find all legal moves
-        if len(moveList)==0:
-            return None,0
+        best = float("-inf")
         for move in moveList:
-            newBoard = copy.deepcopy(board)
-            newBoard = newBoard.applyMove(move, self.token)
-            if self.win(newBoard):
-                return move, self.INFINITY
-            min = self.INFINITY + 1
-            if self.token =="b":
-                enemyToken = "w"
-            else:
-                enemyToken = "b"
-            enemyMoveList = newBoard.getMoves()
-            if len(enemyMoveList) == 0:
-                return None,0
-            for enmove in enemyMoveList:
-                newerBoard = copy.deepcopy(newBoard)
-                newerBoard = newerBoard.applyMove(enmove, enemyToken)
-                currValue = self.h(newerBoard)
-                if currValue < min:
-                    min = currValue
-            if min>max:
-                max=min
+            if sharedAlpha is not None and sharedAlpha.value > alpha:
+                alpha = sharedAlpha.value
+            board.makeMove(move, self.token)
+            val, terminal = self.evaluate(board)
+            if not terminal and maxDepth > 1:
+                val = self._search(board, 1, maxDepth, alpha, self.INFINITY, False)
+            board.undoMove()
+
+            if val > best and (sharedAlpha is None or val > alpha):
+                best = val
                 finalMove = move
-        return finalMove,max
-
-
-
+                alpha = max(alpha, best)
+                if sharedAlpha is not None:
+                    with sharedAlpha.get_lock():
+                        if best > sharedAlpha.value:
+                            sharedAlpha.value = best
+                if terminal and val > 0:
+                    break  # move wins at once
+        return finalMove, best
+
+    def parallelMiniMax(self, board, maxDepth):
+        # ---------------------------------------------------------------------------
+        # Same result as miniMax(board, maxDepth), with the player's moves
+        # shared out between self.workers processes.  The first move (the best
+        # move of the previous iteration, when known) is searched here first, so
+        # that the other moves are searched with its value as alpha ("Young
+        # Brothers Wait"), which keeps most of the alpha-beta cutoffs.  The
+        # processes then share alpha through self.sharedAlpha, so that a better
+        # move found by one of them narrows the searches of the others.
+        # ---------------------------------------------------------------------------
+        self.allocateTable()
+        moveList = self.rootMoves(board)
+        if len(moveList) == 0:
+            return None, 0
+
+        finalMove, best = self.searchMoves(board, moveList[:1], maxDepth, -self.INFINITY)
+        rest = moveList[1:]
+        # no need to search the other moves if the first one wins at once
+        val, terminal = self.evaluateBits(*board.movedBits(finalMove, self.token))
+        if not (terminal and val > 0) and len(rest) > 0:
+            if self.pool is None:
+                self.sharedAlpha = multiprocessing.Value("i", 0)
+                self.pool = ProcessPoolExecutor(self.workers, initializer=_initWorker,
+                                                initargs=(self.sharedAlpha,))
+            self.sharedAlpha.value = best
+            # deal the moves out in turn, so each worker gets a share of the
+            # promising moves at the front of the list
+            futures = [self.pool.submit(_searchMoves, board.toString(), self.token,
+                                        rest[k::self.workers], maxDepth, best, self.deadline)
+                       for k in range(min(self.workers, len(rest)))]
+            for future in futures:
+                move, val = future.result()
+                if val > best:
+                    best = val
+                    finalMove = move
+
+        self.tt[board.hash & TT_MASK] = (board.hash, maxDepth, best, EXACT, finalMove)
+        return finalMove, best
 
     def getHumanMove(self, board):
         # ---------------------------------------------------------------------------
         # If the opponent is a human, the user is prompted to input a legal move.
-        # Determine the set of all legal moves, then check input move against it.
+        # The input is checked with board.isLegal instead of against the list
+        # of all legal moves.
         # ---------------------------------------------------------------------------
-        moveList = board.getMoves()
-        move = None
-
         ValidMove = False
         while (not ValidMove):
             hMove = input("Input your move, " + self.name + \
@@ -792,25 +1067,21 @@ class Player:
             if hMove == "exit":
                 return "exit"
 
-            for move in moveList:
-                if move == hMove:
-                    ValidMove = True
-                    break
+            move = parseMove(hMove)
+            ValidMove = move is not None and board.isLegal(move)
 
             if (not ValidMove):
                 print("Invalid move.  ")
 
-        return hMove
+        return move
 
     def getComputerMove(self, board):
         # ---------------------------------------------------------------------------
         # If the opponent is a computer, use artificial intelligence to select
-        # the best move.
-        # For this demo, a move is chosen at random from the list of legal moves.
+        # the best move: search as deep as self.timeLimit allows, up to
+        # self.searchDepth moves ahead.
         # ---------------------------------------------------------------------------
-        opponent = "w" if self.token == "b" else "b"
-        # move, value = self.miniMax(board, self.INFINITY, 0, 0)
-        move, value = self.miniMax2(board,self.INFINITY)
+        move, value = self.search(board, self.searchDepth, self.timeLimit)
         # print(board , move)
         return move
 
@@ -824,23 +1095,73 @@ class Player:
             return self.getComputerMove(board)
 
 
-def explainMove(move, player):
+# ---------------------------------------------------------------------------
+# Work done in the processes of Player.parallelMiniMax.  Each process keeps
+# one Player per token, so that its transposition table is reused by the
+# following searches, and the pool's shared alpha (see Player.searchMoves).
+# ---------------------------------------------------------------------------
+_workerPlayers = {}
+_sharedAlpha = None
+
+
+def _initWorker(sharedAlpha):
+    global _sharedAlpha
+    _sharedAlpha = sharedAlpha
+
+
+def _searchMoves(boardString, token, moveList, maxDepth, alpha, deadline):
+    if token not in _workerPlayers:
+        _workerPlayers[token] = Player("worker", "computer", token)
+    _workerPlayers[token].deadline = deadline
+    _workerPlayers[token].allocateTable()
+    return _workerPlayers[token].searchMoves(PentagoBoard(boardString), moveList, maxDepth, alpha,
+                                             _sharedAlpha)
+
+
+def moveToString(move):
     # ---------------------------------------------------------------------------
-    # Explain actions performed by move
+    # Write move in the form "b/n gD" used in the user interface and the
+    # transcript: b and n are the block (1..4) and position (1..9) of the
+    # placed token, g is the block to rotate (1..4), and D is L or R.
+    # ---------------------------------------------------------------------------
+    sq, rotBlock, direction = unpackMove(move)
+    i, j = divmod(sq, BOARD_SIZE)
+    gameBlock = (i // GRID_SIZE) * 2 + (j // GRID_SIZE) + 1
+    position = (i % GRID_SIZE) * GRID_SIZE + (j % GRID_SIZE) + 1
+    return str(gameBlock) + "/" + str(position) + " " + str(rotBlock + 1) + \
+           ("L" if direction == LEFT else "R")
+
+
+def parseMove(text):
+    # ---------------------------------------------------------------------------
+    # Read a move written as "b/n gD" (see moveToString).  Returns None if text
+    # is not of that form.
     # ---------------------------------------------------------------------------
+    if len(text) != 6 or text[1] != "/" or text[3] != " " or \
+            text[0] not in "1234" or text[2] not in "123456789" or \
+            text[4] not in "1234" or text[5] not in "LR":
+        return None
 
-    gameBlock = int(move[0])  # 1,2,3,4
-    position = int(move[2])  # 1,2,3,4,5,6,7,8,9
-    rotBlock = int(move[4])  # 1,2,3,4
-    direction = move[5]  # L,R
+    gameBlock = int(text[0])  # 1,2,3,4
+    position = int(text[2])  # 1,2,3,4,5,6,7,8,9
+    rotBlock = int(text[4])  # 1,2,3,4
+    direction = LEFT if text[5] == "L" else RIGHT
 
-    G = PentagoBoard().GRID_SIZE
-    i = (position - 1) // G + G * ((gameBlock - 1) // 2);
-    j = ((position - 1) % G) + G * ((gameBlock - 1) % 2);
+    i = (position - 1) // GRID_SIZE + GRID_SIZE * ((gameBlock - 1) // 2)
+    j = ((position - 1) % GRID_SIZE) + GRID_SIZE * ((gameBlock - 1) % 2)
+    return packMove(i * BOARD_SIZE + j, rotBlock - 1, direction)
+
+
+def explainMove(move, player):
+    # ---------------------------------------------------------------------------
+    # Explain actions performed by move
+    # ---------------------------------------------------------------------------
+    sq, rotBlock, direction = unpackMove(move)
+    i, j = divmod(sq, BOARD_SIZE)
 
     print("Placing " + player.token + " in cell [" + str(i) + "][" + str(j) + \
-          "], and rotating Block " + str(rotBlock) + \
-          (" Left" if direction == "L" else " Right"))
+          "], and rotating Block " + str(rotBlock + 1) + \
+          (" Left" if direction == LEFT else " Right"))
 
 
 # --------------------------------------------------------------------------------
@@ -885,29 +1206,25 @@ if __name__ == "__main__":
     gameOver = False
     currentPlayer = 0
     print(pb)
-    numEmpty = pb.emptyCells
     while (not gameOver):
         move = player[currentPlayer].playerMove(pb)
         if move == "exit":
             break
 
-        print(player[currentPlayer].name + "'s move: " + move)
-        f.write(pb.toString() + "\t" + move + "\n")
+        print(player[currentPlayer].name + "'s move: " + moveToString(move))
+        f.write(pb.toString() + "\t" + moveToString(move) + "\n")
 
-        newBoard = copy.deepcopy(pb)
-        newBoard = newBoard.applyMove(move, player[currentPlayer].token)
+        pb.makeMove(move, player[currentPlayer].token)
 
         explainMove(move, player[currentPlayer])
 
-        print(newBoard)
-        numEmpty = numEmpty - 1
+        print(pb)
 
-        win0 = player[0].win(newBoard)
-        win1 = player[1].win(newBoard)
-        gameOver = win0 or win1 or numEmpty == 0
+        win0 = player[0].win(pb)
+        win1 = player[1].win(pb)
+        gameOver = win0 or win1 or pb.emptyCells == 0
 
         currentPlayer = 1 - currentPlayer
-        pb = copy.deepcopy(newBoard)
 
     # -----------------------------------------------------------------------
     # Game is over, determine winner.
@@ -920,7 +1237,7 @@ if __name__ == "__main__":
         print(player[0].name + " (" + descr[player[0].token] + ") wins")
     elif win1:
         print(player[1].name + " (" + descr[player[1].token] + ") wins")
-    elif numEmpty == 0:
+    elif pb.emptyCells == 0:
         print("Game ends in a tie (no winner).")
 
     f.write(pb.toString() + "\t\n")
@@ -0,0 +1,125 @@
+import random
+import unittest
+
+from Pentago import PentagoBoard, Player, MAX_HEURISTIC, TT_MASK, moveToString, parseMove
+
+
+class BoardTest(unittest.TestCase):
+    BOARD = "w.b.bw.w.b.wb.w..wb....w...bw.bbb.ww"
+
+    # (board, move, token, board after the move), as played by the original
+    # cell-list implementation
+    MOVES = [
+        ("....................................", "1/1 1R", "w",
+         "..w................................."),
+        (BOARD, "1/2 1L", "b", "b.w.bwbw.b.ww.b..wb....w...bw.bbb.ww"),
+        (BOARD, "2/5 2R", "w", "w.b.b..w..wbb.wwwwb....w...bw.bbb.ww"),
+        (BOARD, "3/4 4L", "b", "w.b.bw.w.b.wb.w..wb..w.wb...wwbbb.b."),
+        (BOARD, "4/1 3R", "w", "w.b.bw.w.b.wb.w..wb.bw.wb..bw.b...ww"),
+    ]
+
+    def randomGame(self, board, seed, length):
+        # play length random moves on board, returning the states passed through
+        rng = random.Random(seed)
+        states = []
+        for k in range(length):
+            states.append((board.w, board.b, board.empty, board.hash, board.emptyCells,
+                           board.getMoves()))
+            board.makeMove(rng.choice(board.getMoves()), "wb"[k % 2])
+        return states
+
+    def testApplyMove(self):
+        for before, move, token, after in self.MOVES:
+            board = PentagoBoard(before)
+            self.assertEqual(board.applyMove(parseMove(move), token).toString(), after)
+            self.assertEqual(board.toString(), before)
+
+    def testIncrementalHash(self):
+        for seed in range(20):
+            rng = random.Random(seed)
+            board = PentagoBoard()
+            for k in range(30):
+                board.makeMove(rng.choice(board.getMoves()), "wb"[k % 2])
+                self.assertEqual(board.hash, PentagoBoard(board.toString()).hash)
+
+    def testUndoMove(self):
+        for seed in range(20):
+            board = PentagoBoard(self.BOARD)
+            states = self.randomGame(board, seed, 10)
+            while states:
+                board.undoMove()
+                self.assertEqual((board.w, board.b, board.empty, board.hash, board.emptyCells,
+                                  board.getMoves()), states.pop())
+            self.assertEqual(board.history, [])
+            self.assertEqual(board.toString(), self.BOARD)
+
+    def testMoveStrings(self):
+        moves = PentagoBoard().getMoves()
+        self.assertEqual(len(moves), 288)
+        self.assertEqual(len(set(map(moveToString, moves))), 288)
+        for move in moves:
+            self.assertEqual(parseMove(moveToString(move)), move)
+
+    def testIsLegal(self):
+        board = PentagoBoard(self.BOARD)
+        self.assertTrue(board.isLegal(parseMove("1/2 3L")))  # cell [0][1] is empty
+        self.assertFalse(board.isLegal(parseMove("1/1 3L")))  # cell [0][0] holds w
+        self.assertEqual(sum(board.isLegal(move) for move in PentagoBoard().getMoves()),
+                         len(board.getMoves()))
+
+
+class WinScaleTest(unittest.TestCase):
+    # a board on which the heuristic of a non-winning move is above 10000,
+    # the value of a win before wins were scaled above MAX_HEURISTIC
+    BOARD = "wbbwbbb.bbwbwbbw.wbwwwwbbwwwwbbwwwbb"
+
+    def testWinsOutrankHeuristic(self):
+        self.assertLess(MAX_HEURISTIC, Player.WIN_BOUND)
+
+    def testHeuristicIsNotAProvenResult(self):
+        player = Player("x", "computer", "w")
+        board = PentagoBoard(self.BOARD)
+        for move in board.getMoves():
+            value, terminal = player.evaluateBits(*board.movedBits(move, player.token))
+            if not terminal:
+                self.assertLess(abs(value), Player.WIN_BOUND)
+
+    def testDeepeningGoesOnUntilDecided(self):
+        player = Player("x", "computer", "w")
+        player.workers = 1
+        board = PentagoBoard("b..wwb.ww...b...bb..ww.bbwwwwb.b.b..")
+        move, value = player.search(board, 3, 1e9)
+        self.assertLess(abs(value), Player.WIN_BOUND)
+        self.assertEqual(player.tt[board.hash & TT_MASK][1], 3)
+
+    def testComputerTakesImmediateWin(self):
+        player = Player("x", "computer", "w")
+        player.workers = 1
+        board = PentagoBoard(self.BOARD)
+        move = player.getComputerMove(board)
+        self.assertEqual(moveToString(move), "1/5 2L")
+        self.assertTrue(player.win(board.applyMove(move, player.token)))
+
+
+class ParallelSearchTest(unittest.TestCase):
+    BOARD = "b..wwb.ww...b...bb..ww.bbwwwwb.b.b.."
+
+    def testParallelMatchesSequential(self):
+        sequential = Player("x", "computer", "w")
+        sequential.workers = 1
+        move, value = sequential.miniMax(PentagoBoard(self.BOARD), 3)
+
+        parallel = Player("x", "computer", "w")
+        parallel.workers = 2
+        try:
+            parallelMove, parallelValue = parallel.parallelMiniMax(PentagoBoard(self.BOARD), 3)
+        finally:
+            if parallel.pool is not None:
+                parallel.pool.shutdown()
+        self.assertIsNotNone(parallel.pool)  # the moves were split between processes
+        self.assertEqual(parallelValue, value)
+        self.assertTrue(PentagoBoard(self.BOARD).isLegal(parallelMove))
+
+
+if __name__ == "__main__":
+    unittest.main()